@@ -32,7 +32,7 @@ class ImplicitProducer(object):
         # load train & test set
         self._train_df = pd.read_csv(os.path.join(self._root, self.__TRAIN_FILE_NAME))
         self._test_df = pd.read_csv(os.path.join(self._root, self.__TEST_FILE_NAME))
-        self._comb_df = self._train_df.append(self._test_df)
+        self._comb_df = pd.concat([self._train_df, self._test_df])
 
         for column in self._train_df.columns:
             if self._train_df[column].dtype == object:
@@ -2,6 +2,7 @@
 import numpy as np
 import pandas as pd
 import pickle
+import hashlib
 import time
 import os
 import logging
@@ -29,7 +30,7 @@ class ColumnSelector(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        return X[self.columns].to_dict(orient='record')
+        return X[self.columns].to_dict(orient='records')
 
 
 class KKboxRSDataset(Dataset):
@@ -70,6 +71,21 @@ class FeatureProcessor(object):
     train_file = 'train.csv'
     test_file = 'test.csv'
 
+    # run the full-frame no-null sanity checks after each processing step
+    debug = False
+
+    # column schemas, highly repeated strings are parsed straight into categoricals
+    songs_dtype = {'song_length': 'int32', 'genre_ids': 'category', 'artist_name': 'category',
+                   'composer': 'category', 'lyricist': 'category', 'language': 'float32'}
+    members_dtype = {'city': 'int8', 'bd': 'int16', 'gender': 'category', 'registered_via': 'int8'}
+    train_dtype = {'msno': 'category', 'song_id': 'category', 'source_system_tab': 'category',
+                   'source_screen_name': 'category', 'source_type': 'category', 'target': 'int8'}
+    test_dtype = {'id': 'int32', 'msno': 'category', 'song_id': 'category', 'source_system_tab': 'category',
+                  'source_screen_name': 'category', 'source_type': 'category'}
+
+    # rows per chunk when streaming the large train/test files
+    chunksize = 1000000
+
     def __init__(self, root='./data'):
 
         assert os.path.exists(root), '%s not exists!' % root
@@ -86,29 +102,27 @@ class FeatureProcessor(object):
         self._mean_song_length = np.mean(train['song_length'])
 
         # number of times a song has been played before
-        self._dict_count_song_played_train = {k: v for k, v in train['song_id'].value_counts().items()}
-        self._dict_count_song_played_test = {k: v for k, v in test['song_id'].value_counts().items()}
-
+        song_played = self._count_played(train['song_id'], test['song_id'])
         # number of times the artist has been played
-        self._dict_count_artist_played_train = {k: v for k, v in train['artist_name'].value_counts().items()}
-        self._dict_count_artist_played_test = {k: v for k, v in test['artist_name'].value_counts().items()}
+        artist_played = self._count_played(train['artist_name'], test['artist_name'])
 
-        train['count_artist_played'] = train['artist_name'].apply(self._count_artist_played).astype(np.int64)
-        test['count_artist_played'] = test['artist_name'].apply(self._count_artist_played).astype(np.int64)
+        train['count_artist_played'] = self._map(train['artist_name'], artist_played).fillna(0).astype(np.int32)
+        test['count_artist_played'] = self._map(test['artist_name'], artist_played).fillna(0).astype(np.int32)
 
-        train['count_song_played'] = train['song_id'].apply(self._count_song_played).astype(np.int64)
-        test['count_song_played'] = test['song_id'].apply(self._count_song_played).astype(np.int64)
+        train['count_song_played'] = self._map(train['song_id'], song_played).fillna(0).astype(np.int32)
+        test['count_song_played'] = self._map(test['song_id'], song_played).fillna(0).astype(np.int32)
 
         train = self._add_new_feature(train, True)
         test = self._add_new_feature(test, False)
 
-        track_count_df = train[['song_id', 'artist_name']].drop_duplicates('song_id')
-        track_count_df = track_count_df.groupby('artist_name').agg('count').reset_index()
-        track_count_df.columns = ['artist_name', 'track_count']
-        track_count_df = track_count_df.sort_values('track_count', ascending=False)
+        # number of distinct songs of the artist
+        track_count = train.groupby('artist_name', observed=True)['song_id'].nunique()
 
-        train = self._add_comb_feature(train, test, track_count_df, is_train=True)
-        test = self._add_comb_feature(train, test, track_count_df, is_train=False)
+        train = self._add_comb_feature(train, test, track_count, is_train=True)
+        test = self._add_comb_feature(train, test, track_count, is_train=False)
+
+        train = self._downcast(train)
+        test = self._downcast(test)
 
         # total_genre_ids = pd.concat([train.genre_ids, test.genre_ids])
         # self.genres = np.unique('|'.join(total_genre_ids).split('|'))
@@ -116,14 +130,27 @@ class FeatureProcessor(object):
         # train = self._add_genre_feature(train)
         # test = self._add_genre_feature(test)
 
-        train.fillna('na_for_later', inplace=True)
-        test.fillna('na_for_later', inplace=True)
+        # bd outliers are NaN from _process_member, keep them apart from the rows
+        # without any member record, which become 'na_for_later' below
+        for df in (train, test):
+            outliers = df['bd'].isna() & df['city'].notna()
+            if outliers.any():
+                df['bd'] = df['bd'].astype(object).where(~outliers, 'nan')
+
+        train = self._fillna(train, 'na_for_later')
+        test = self._fillna(test, 'na_for_later')
 
         for col in train.columns:
             if train[col].dtype == object:
                 train[col] = train[col].astype('category')
                 test[col] = test[col].astype('category')
 
+        # the merges are done, drop the ids a frame does not hold itself since
+        # ImplicitProcessor looks every category of msno/song_id up by value
+        for col in ['msno', 'song_id']:
+            train[col] = train[col].cat.remove_unused_categories()
+            test[col] = test[col].cat.remove_unused_categories()
+
         self.train = train
         self.test = test
 
@@ -135,21 +162,74 @@ class FeatureProcessor(object):
     def _load_raw(self):
         start = time.time()
 
-        self.songs = pd.read_csv(os.path.join(self.root, self.songs_file))
-        self.extra = pd.read_csv(os.path.join(self.root, self.extra_file))
-        self.members = pd.read_csv(os.path.join(self.root, self.members_file),
-                                   parse_dates=['registration_init_time','expiration_date'])
+        self.songs = self._read_csv(self.songs_file, dtype=self.songs_dtype)
+        self.extra = self._read_csv(self.extra_file)
+        self.members = self._read_csv(self.members_file, dtype=self.members_dtype)
+        # parsed here, the pyarrow engine may hand parse_dates columns back as raw integers
+        for col in ['registration_init_time', 'expiration_date']:
+            self.members[col] = pd.to_datetime(self.members[col].astype(str), format='%Y%m%d')
 
-        train_raw = pd.read_csv(
-                os.path.join(self.root, self.train_file))
+        train_raw = self._read_csv(self.train_file, chunksize=self.chunksize, dtype=self.train_dtype)
 
-        test_raw = pd.read_csv(
-                os.path.join(self.root, self.test_file))
+        test_raw = self._read_csv(self.test_file, chunksize=self.chunksize, dtype=self.test_dtype)
+
+        # join keys share one set of categories, so merges join on the codes
+        self._align_categories('song_id', [train_raw, test_raw, self.songs, self.extra])
+        self._align_categories('msno', [train_raw, test_raw, self.members])
 
         logging.debug("load raw data in %0.2fs" % (time.time() - start))
 
         return train_raw, test_raw
 
+    def _read_csv(self, filename, chunksize=None, **kwargs):
+        # parsed frames are cached as parquet next to the csv, dtypes included;
+        # the parse options are hashed into the name so a new schema re-parses
+        path = os.path.join(self.root, filename)
+        schema = hashlib.md5(repr(sorted(kwargs.items())).encode('utf-8')).hexdigest()[:8]
+        cache = '%s.%s.parquet' % (os.path.splitext(path)[0], schema)
+
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            return pd.read_parquet(cache)
+
+        if chunksize is None:
+            df = pd.read_csv(path, engine='pyarrow', **kwargs)
+        else:
+            # the pyarrow engine can not stream, chunks go through the c engine
+            df = self._concat_chunks(pd.read_csv(path, chunksize=chunksize, **kwargs))
+        df.to_parquet(cache, compression='zstd')
+        return df
+
+    def _concat_chunks(self, reader):
+        # keep only the column pieces of each chunk, then build the frame column by
+        # column; categoricals get the union of the categories every chunk inferred
+        # on its own (an all-NaN chunk has none) and each piece is recoded onto it
+        pieces = {}
+        for chunk in reader:
+            for col in chunk.columns:
+                pieces.setdefault(col, []).append(chunk[col].values)
+
+        columns = list(pieces)
+        data = {}
+        for col in columns:
+            values = pieces.pop(col)
+            if isinstance(values[0], pd.Categorical):
+                categories = [v.categories for v in values if len(v.categories)]
+                categories = categories[0].append(categories[1:]).unique() if categories else pd.Index([])
+                codes = np.concatenate([self._recode(v, categories) for v in values])
+                data[col] = pd.Categorical.from_codes(codes, dtype=pd.api.types.CategoricalDtype(categories))
+            else:
+                data[col] = np.concatenate(values)
+        return pd.DataFrame(data, columns=columns)
+
+    def _align_categories(self, col, frames):
+        # categorical keys only contribute their categories, not every row
+        values = [df[col].cat.categories.to_series() if df[col].dtype.name == 'category' else df[col]
+                  for df in frames]
+        categories = pd.concat(values, ignore_index=True).unique()
+        dtype = pd.api.types.CategoricalDtype(categories)
+        for df in frames:
+            df[col] = df[col].astype(dtype)
+
     def _preprocess(self, df):
 
         start = time.time()
@@ -158,9 +238,9 @@ class FeatureProcessor(object):
         df = df.merge(self.extra, on='song_id', how='left')
 
         # howeverforever
-        df['source_system_tab'].fillna('others', inplace=True)
-        df['source_screen_name'].fillna('others', inplace=True)
-        df['source_type'].fillna('nan', inplace=True)
+        df['source_system_tab'] = self._fillna(df['source_system_tab'], 'others')
+        df['source_screen_name'] = self._fillna(df['source_screen_name'], 'others')
+        df['source_type'] = self._fillna(df['source_type'], 'nan')
 
         df.song_length.fillna(200000, inplace=True)
         logging.debug("preprocess in %0.2fs" % (time.time() - start))
@@ -178,37 +258,21 @@ class FeatureProcessor(object):
 
         return df
 
-    def _add_comb_feature(self, train, test, track_count_df, is_train=True):
+    def _add_comb_feature(self, train, test, track_count, is_train=True):
 
         start = time.time()
         if is_train:
-            self.count_df = train['song_id'].value_counts().reset_index()
-            artist_count_df = train[['artist_name', 'target']].groupby('artist_name').agg(
-                ['mean', 'count']).reset_index()
+            play_count = train['song_id'].value_counts()
             df = train
         else:
-            comb_df = train.append(test)
-            self.count_df = comb_df['song_id'].value_counts().reset_index()
-            artist_count_df = comb_df[['artist_name', 'target']].groupby('artist_name').agg(
-                ['mean', 'count']).reset_index()
+            play_count = pd.concat([train['song_id'], test['song_id']], ignore_index=True).value_counts()
 
             df = test
 
-        self.count_df.columns = ['song_id', 'play_count']
-
-        df = df.merge(self.count_df, on='song_id', how='left')
-        df['play_count'].fillna(0, inplace=True)
-
-        artist_count_df.columns = ['artist_name', 'replay_pb', 'play_count']
-
-        artist_count_df = artist_count_df.merge(
-            track_count_df, on='artist_name', how='left')
-        artist_count_df['track_count'].fillna(0, inplace=True)
+        df['play_count'] = self._map(df['song_id'], play_count).fillna(0).astype(np.int32)
 
-        df = df.merge(
-            artist_count_df[['artist_name', 'track_count']],
-            on='artist_name',
-            how='left')
+        # rows without an artist keep NaN, as the former left merge did
+        df['track_count'] = self._map(df['artist_name'], track_count).fillna(0).where(df['artist_name'].notna())
 
         logging.debug("add comb features in %0.2fs" % (time.time() - start))
         return df
@@ -218,94 +282,123 @@ class FeatureProcessor(object):
         start = time.time()
 
         # howeverforever
-        df['source_merged'] = df['source_system_tab'].map(str) + ' | ' + df['source_screen_name'].map(str) + ' | ' + df['source_type'].map(str)
+        source = ['source_system_tab', 'source_screen_name', 'source_type']
 
         if is_train:
-            self.count_df = df[['source_merged', 'target']].groupby('source_merged').agg(['mean', 'count'])
-            self.count_df.reset_index(inplace=True)
-            self.count_df.columns = ['source_merged', 'source_replay_pb', 'source_replay_count']
+            self.count_df = df.groupby(source, observed=True)['target'].agg(['mean', 'count']).reset_index()
+            self.count_df.columns = source + ['source_replay_pb', 'source_replay_count']
 
-        df = df.merge(self.count_df, on='source_merged', how='left')
+        source_replay_pb = df[source].merge(self.count_df, on=source, how='left')['source_replay_pb'].values
 
-        df['1h_source'] = df['source_replay_pb'].apply(self._one_hot_encode_source)
-        df.drop(['source_merged', 'source_replay_pb', 'source_replay_count'], axis=1, inplace=True)
+        df['1h_source'] = (source_replay_pb >= 0.6).astype(np.int8)
 
-        df['1h_system_tab'] = df['source_system_tab'].apply(self._one_hot_encode_system_tab)
-        df['1h_screen_name'] = df['source_screen_name'].apply(self._one_hot_encode_screen_name)
-        df['1h_source_type'] = df['source_type'].apply(self._one_hot_encode_source_type)
+        df['1h_system_tab'] = (df['source_system_tab'] == 'my library').astype(np.int8)
+        df['1h_screen_name'] = df['source_screen_name'].isin(['Local playlist more', 'My library']).astype(np.int8)
+        df['1h_source_type'] = df['source_type'].isin(['local-library', 'local-playlist']).astype(np.int8)
 
-        df['smaller_song'] = df['song_length'].apply(self._smaller_song).astype(np.int8)
+        df['smaller_song'] = (df['song_length'] < self._mean_song_length).astype(np.int8)
 
-        df['is_2017'] = df['song_year'].apply(self._is_2017).astype(np.int8)
+        df['is_2017'] = (df['song_year'] == 2017).astype(np.int8)
 
         logging.debug("add new features in %0.2fs" % (time.time() - start))
 
         return df
 
     def _process_songs(self):
-        self.songs['artist_name'].fillna('no_artist',inplace=True)
-        self.songs['is_featured'] = self.songs['artist_name'].apply(self._is_featured).astype(np.int8)
+        # song features are computed once per song, before any merge
+        assert self.songs['song_id'].is_unique, 'songs must be processed before merging!'
+
+        artist_name = self._fillna(self.songs['artist_name'], 'no_artist')
+        # new columns are attached in one go at the end
+        new = {'artist_name': artist_name}
+
+        # str methods on a categorical only run over its categories
+        new['is_featured'] = artist_name.str.contains('feat', regex=False).astype(np.int8)
+
+        # one scan for all separators, none of them can overlap each other
+        new['artist_count'] = artist_name.str.count('and|,|feat|&').where(
+                              artist_name != 'no_artist', 0).astype(np.int8)
 
-        self.songs['artist_count'] = self.songs['artist_name'].apply(self._artist_count).astype(np.int8)
-        self.songs['artist_composer'] = (self.songs['artist_name'] == self.songs['composer']).astype(np.int8)
+        # recode onto the artist categories and compare codes, artist_name has no
+        # missing values so a missing or unknown composer/lyricist (-1) never matches
+        artist_codes = artist_name.cat.codes.values
+        eq_ac = artist_codes == self._recode(self.songs['composer'], artist_name.cat.categories)
+        eq_al = artist_codes == self._recode(self.songs['lyricist'], artist_name.cat.categories)
+        new['artist_composer'] = eq_ac.view(np.int8)
 
         # if artist, lyricist and composer are all three same
-        self.songs['artist_composer_lyricist'] = ((self.songs['artist_name'] == self.songs['composer']) &
-                                                  (self.songs['artist_name'] == self.songs['lyricist']) &
-                                                  (self.songs['composer'] == self.songs['lyricist'])).astype(np.int8)
+        new['artist_composer_lyricist'] = (eq_ac & eq_al).view(np.int8)
 
 
         # howeverforever
-        self.songs['genre_count'] = self.songs['genre_ids'].apply(self._parse_splitted_category_to_number)
-        self.songs['composer_count'] = self.songs['composer'].apply(self._parse_splitted_category_to_number)
-        self.songs['lyricist_count'] = self.songs['lyricist'].apply(self._parse_splitted_category_to_number)
+        new['genre_count'] = self._count_splitted_category(self.songs['genre_ids'])
+        new['composer_count'] = self._count_splitted_category(self.songs['composer'])
+        new['lyricist_count'] = self._count_splitted_category(self.songs['lyricist'])
 
-        self.songs['1h_lang'] = self.songs['language'].apply(self._one_hot_encode_lang)
+        new['1h_lang'] = self.songs['language'].isin([-1, 17, 45]).astype(np.int8)
 
-        self.songs['1h_song_length'] = self.songs['song_length'].apply(lambda x: 1 if x <= 239738 else 0)
+        new['1h_song_length'] = (self.songs['song_length'].values <= 239738).view(np.int8)
 
-        self.songs['language'].fillna('nan', inplace=True)
-        self.songs['composer'].fillna('nan', inplace=True)
-        self.songs['lyricist'].fillna('nan', inplace=True)
-        self.songs['genre_ids'].fillna('nan', inplace=True)
+        new['language'] = self.songs['language'].fillna('nan')
+        new['composer'] = self._fillna(self.songs['composer'], 'nan')
+        new['lyricist'] = self._fillna(self.songs['lyricist'], 'nan')
+        new['genre_ids'] = self._fillna(self.songs['genre_ids'], 'nan')
+        self.songs = self.songs.assign(**new)
         # self.songs.drop(['language'], axis=1, inplace=True)
-        assert(~self.songs.isnull().any().any())
+        if self.debug:
+            assert not self.songs.isnull().values.any()
+        self.songs = self._downcast(self.songs)
 
     def _process_member(self):
 
-        self.members['membership_days'] = self.members['expiration_date'].subtract(self.members['registration_init_time']).dt.days.astype(int)
+        reg_days, reg_year, reg_month, reg_date = self._split_date(self.members['registration_init_time'])
+        exp_days, exp_year, exp_month, exp_date = self._split_date(self.members['expiration_date'])
 
-        self.members['registration_year'] = self.members['registration_init_time'].dt.year
-        self.members['registration_month'] = self.members['registration_init_time'].dt.month
-        self.members['registration_date'] = self.members['registration_init_time'].dt.day
+        new = {'membership_days': (exp_days - reg_days).astype(np.int16)}
 
-        self.members['expiration_year'] = self.members['expiration_date'].dt.year
-        self.members['expiration_month'] = self.members['expiration_date'].dt.month
-        self.members['expiration_date'] = self.members['expiration_date'].dt.day
-        self.members = self.members.drop(['registration_init_time'], axis=1)
+        new['registration_year'] = reg_year
+        new['registration_month'] = reg_month
+        new['registration_date'] = reg_date
+
+        new['expiration_year'] = exp_year
+        new['expiration_month'] = exp_month
+        new['expiration_date'] = exp_date
 
         # howeverforever
-        self.members['bd'] = self.members['bd'].apply(self._transform_bd_outliers)
-        self.members['gender'].fillna('nan', inplace=True)
-        self.members['1h_via'] = self.members['registered_via'].apply(self._one_hot_encode_via)
-        assert(~self.members.isnull().any().any())
+        # figure is from "exploration"
+        bd = self.members['bd'].values
+        mean = 28.99737187910644
+        std = 9.538470787507382
+        outliers = (bd >= 120) | (bd <= 7) | (np.abs(bd - mean) > 3 * std)
+        new['bd'] = np.where(outliers, np.nan, bd).astype(np.float32)
+        new['gender'] = self._fillna(self.members['gender'], 'nan')
+        new['1h_via'] = (self.members['registered_via'] != 4).astype(np.int8)
+        self.members = self.members.drop(['registration_init_time'], axis=1).assign(**new)
+        # outlier bd are kept as NaN
+        if self.debug:
+            assert not self.members.drop(['bd'], axis=1).isnull().values.any()
+        self.members = self._downcast(self.members)
 
     def _process_extra(self):
-        self.extra['song_year'] = self.extra['isrc'].apply(self._transform_isrc_to_year)
-        self.extra.drop(['name', 'isrc'], axis=1, inplace=True)
+        # this year 2017
+        suffix = pd.to_numeric(self.extra['isrc'].str.slice(5, 7), errors='coerce')
+        song_year = suffix + np.where(suffix > 17, 1900, 2000)
 
         # howeverforever
         # self.extra['song_country'] = self.extra['isrc'].apply(self._transform_isrc_to_country)
         # self.extra['song_registration'] = self.extra['isrc'].apply(self._transform_isrc_to_reg)
         # self.extra['song_designation'] = self.extra['isrc'].apply(self._transfrom_isrc_to_desig)
 
-        self.extra['1h_song_year'] = self.extra['song_year'].apply(self._one_hot_encode_year)
+        new = {'song_year': song_year.fillna(2017)}
+        new['1h_song_year'] = song_year.between(2013, 2017).astype(np.int8)
         # self.extra['1h_song_country'] = self.extra['song_country'].apply(self._one_hot_encode_country)
 
-        self.extra['song_year'].fillna(2017, inplace=True)
         # self.extra['song_registration'].fillna('***', inplace=True)
+        self.extra = self.extra.drop(['name', 'isrc'], axis=1).assign(**new)
 
-        assert(~self.extra.isnull().any().any())
+        if self.debug:
+            assert not self.extra.isnull().values.any()
+        self.extra = self._downcast(self.extra)
 
     def _compute_msno_song_similarity(self, train, test):
 
@@ -336,8 +429,8 @@ class FeatureProcessor(object):
                 ('extract', ColumnSelector(song_feature)),
                 ('dicVect', DictVectorizer())])
 
-        songs = self.songs.merge(self.extra, on='song_id', how='left').fillna('test')
-        members = self.members.fillna('test')
+        songs = self._fillna(self.songs.merge(self.extra, on='song_id', how='left'), 'test')
+        members = self._fillna(self.members, 'test')
         self.msno_x = {v: i for i, v in enumerate(members.msno)}
         self.song_x = {v: i for i, v in enumerate(songs.song_id)}
 
@@ -403,6 +496,47 @@ class FeatureProcessor(object):
             # else:
             #     self.unknown_song_map[i] = 'new'
 
+    def _count_played(self, train, test):
+        # train counts where the key was played in train, test counts otherwise
+        # (categorical value_counts also report unused categories, skip those)
+        train_count = train.value_counts()
+        return train_count[train_count > 0].combine_first(test.value_counts())
+
+    def _downcast(self, df):
+        # shrink numeric columns to the smallest dtype holding their values
+        for col in df.select_dtypes('integer').columns:
+            df[col] = pd.to_numeric(df[col], downcast='unsigned' if df[col].min() >= 0 else 'integer')
+        for col in df.select_dtypes('floating').columns:
+            df[col] = pd.to_numeric(df[col], downcast='float')
+        return df
+
+    def _recode(self, s, categories):
+        # codes of a categorical on other categories, -1 for missing or unknown values
+        s = s.array if isinstance(s, pd.Series) else s
+        codes = np.append(categories.get_indexer(s.categories), -1)
+        return codes[s.codes]
+
+    def _map(self, s, mapper):
+        # look categoricals up once per category, then broadcast by code
+        if s.dtype.name == 'category':
+            values = np.append(mapper.reindex(s.cat.categories).values, np.nan)
+            return pd.Series(values[s.cat.codes.values], index=s.index)
+        return s.map(mapper)
+
+    def _fillna(self, df, value):
+        # categoricals only accept a fill value that is one of their categories,
+        # and pandas checks that even when there is nothing to fill
+        if isinstance(df, pd.Series):
+            if not df.isna().any():
+                return df
+            if df.dtype.name == 'category' and value not in df.cat.categories:
+                df = df.cat.add_categories([value])
+            return df.fillna(value)
+
+        categories = df.select_dtypes('category').columns
+        df = df.assign(**{col: self._fillna(df[col], value) for col in categories})
+        return df.fillna({col: value for col in df.columns.difference(categories)})
+
     def _get_rank(self, model, w, id_list, known_list):
         result = cosine_similarity(model, model[w].toarray().reshape(1, -1)).reshape(1, -1)[0]
         r = pd.DataFrame({'id': id_list, 'similarity': result, 'known': known_list})
@@ -414,6 +548,16 @@ class FeatureProcessor(object):
         delta = end - start
         return delta.days
 
+    def _split_date(self, dates):
+        # days since epoch, year, month and day straight from the datetime64 buffer
+        assert np.issubdtype(dates.dtype, np.datetime64), '%s is not a datetime column!' % dates.name
+        days = dates.values.astype('datetime64[D]')
+        months = days.astype('datetime64[M]')
+        year = months.astype('datetime64[Y]').astype(np.int64) + 1970
+        month = months.astype(np.int64) % 12 + 1
+        day = (days - months).astype(np.int64) + 1
+        return days.astype(np.int32), year.astype(np.int16), month.astype(np.int8), day.astype(np.int8)
+
     def _transform_outliers(self, x, mean, std):
         return x if np.abs(x - mean) <= 3 * std else -1
 
@@ -423,57 +567,13 @@ class FeatureProcessor(object):
         month = int(time_str[4:6])
         return int("%04d%02d" % (year, month))
 
-    def _transform_bd_outliers(self, bd):
-        # figure is from "exploration"
-        if bd >= 120 or bd <= 7:
-            return 'nan'
-        mean = 28.99737187910644
-        std = 9.538470787507382
-        return bd if abs(bd - mean) <= 3 * std else 'nan'
-
-    def _parse_splitted_category_to_number(self, x):
-        if x is np.nan:
-            return 0
-        x = str(x)
-        x.replace('/', '|')
-        x.replace(';', '|')
-        x.replace('\\', '|')
-        x.replace(' and ', '|')
-        x.replace('&', '|')
-        x.replace('+', '|')
-        return x.count('|') + 1
-
-    def _one_hot_encode_year(self, x):
-        return 1 if 2013 <= float(x) <= 2017 else 0
+    def _count_splitted_category(self, s):
+        # number of entries separated by any of | / ; \ + & or ' and ', 0 for missing
+        return s.str.count(r'[|/;\\+&]| and ').add(1).where(s.notna(), 0).astype(np.int16)
 
     def _one_hot_encode_country(self, x):
         return 1 if x == 'TW' or x == 'CN' or x == 'HK' else 0
 
-    def _one_hot_encode_via(self, x):
-        return 0 if x == 4 else 1
-
-    def _one_hot_encode_screen_name(self, x):
-        return 1 if x == 'Local playlist more' or x == 'My library' else 0
-
-    def _one_hot_encode_system_tab(self, x):
-        return 1 if x == 'my library' else 0
-
-    def _one_hot_encode_source_type(self, x):
-        return 1 if x == 'local-library' or x == 'local-playlist' else 0
-
-    def _one_hot_encode_source(self, x):
-        return 1 if x >= 0.6 else 0
-
-    def _one_hot_encode_lang(self, x):
-        return 1 if x in [-1, 17, 45] else 0
-
-    def _transform_isrc_to_year(self, isrc):
-        if type(isrc) != str:
-            return np.nan
-        # this year 2017
-        suffix = int(isrc[5:7])
-        return 1900 + suffix if suffix > 17 else 2000 + suffix
-
     def _genre_id_count(self, x):
         if x == 'no_genre_id':
             return 0
@@ -493,51 +593,12 @@ class FeatureProcessor(object):
         else:
             return sum(map(x.count, ['|', '/', '\\', ';'])) + 1
 
-    def _is_featured(self, x):
-        if 'feat' in str(x) :
-            return 1
-        return 0
-
-    def _artist_count(self, x):
-        if x == 'no_artist':
-            return 0
-        else:
-            return x.count('and') + x.count(',') + x.count('feat') + x.count('&')
-
     def _song_lang_boolean(self, x):
         # is song language 17 or 45.
         if '17.0' in str(x) or '45.0' in str(x):
             return 1
         return 0
 
-    def _is_2017(self, x):
-        if x == 2017.0:
-            return 1
-        return 0
-
-    def _smaller_song(self, x):
-        if x < self._mean_song_length:
-            return 1
-        return 0
-
-    def _count_song_played(self, x):
-        try:
-            return self._dict_count_song_played_train[x]
-        except KeyError:
-            try:
-                return self._dict_count_song_played_test[x]
-            except KeyError:
-                return 0
-
-    def _count_artist_played(self, x):
-        try:
-            return self._dict_count_artist_played_train[x]
-        except KeyError:
-            try:
-                return self._dict_count_artist_played_test[x]
-            except KeyError:
-                return 0
-
     def _find_genre(self, g_list, g):
         return True if g in g_list else False
 